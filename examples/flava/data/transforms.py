@@ -5,6 +5,7 @@
 # LICENSE file in the root directory of this source tree.
 
 import math
+import os
 import random
 import warnings
 from functools import partial
@@ -17,6 +18,11 @@ from PIL import Image
 from torchvision import transforms
 from transformers import BertTokenizer
 
+try:
+    import numba
+except ImportError:
+    numba = None
+
 
 LOGIT_LAPLACE_EPS: float = 0.1
 IMAGENET_DEFAULT_MEAN = (0.485, 0.456, 0.406)
@@ -30,6 +36,15 @@ TEXT_DEFAULT_TOKENIZER = "bert-base-uncased"
 TEXT_WHOLE_WORD_MASK_TOKENIZER = "bert-large-uncased-whole-word-masking"
 
 
+def convert_to_rgb(img: Image.Image) -> Image.Image:
+    # Plain function instead of an inline lambda so the transform stays
+    # picklable for spawned DataLoader workers; skips the PIL conversion
+    # entirely for the common already-RGB case.
+    if img.mode == "RGB":
+        return img
+    return img.convert("RGB")
+
+
 def map_pixels(x: torch.Tensor) -> torch.Tensor:
     if x.dtype != torch.float:
         raise ValueError("expected input to have type float")
@@ -118,7 +133,11 @@ def pad_batch(batch, batch_size):
     for item in batch.keys():
         if isinstance(batch[item], torch.Tensor):
             diff = batch_size - batch[item].size(0)
-            pad = batch[item][-diff:].detach().clone()
+            if diff <= 0:
+                continue
+            # cat copies its inputs, so pad with a detached view rather
+            # than allocating an intermediate clone of the repeated rows
+            pad = batch[item][-diff:].detach()
             batch[item] = torch.cat([batch[item], pad], dim=0)
     return batch
 
@@ -216,6 +235,62 @@ class TwoWayResize(transforms.Resize):
         return img, second_img
 
 
+if numba is not None:
+
+    @numba.njit(cache=True, fastmath=True)
+    def _generate_mask_numba(
+        height,
+        width,
+        num_masking_patches,
+        min_num_patches,
+        max_num_patches,
+        log_aspect_lo,
+        log_aspect_hi,
+        seed,
+    ):
+        # Compiled version of MaskingGenerator's rejection-sampling loop;
+        # runs with native RNG calls and no interpreter overhead. Numba
+        # uses its own internal RNG state, so reseed it on every call from
+        # the caller's generator stream to keep masking reproducible.
+        np.random.seed(seed)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        mask_count = 0
+        while mask_count < num_masking_patches:
+            max_mask_patches = min(
+                num_masking_patches - mask_count, max_num_patches
+            )
+            low = min(min_num_patches, max_mask_patches)
+            high = max(min_num_patches, max_mask_patches)
+            delta = 0
+            for _attempt in range(10):
+                target_area = np.random.uniform(low, high)
+                aspect_ratio = math.exp(
+                    np.random.uniform(log_aspect_lo, log_aspect_hi)
+                )
+                h = int(round(math.sqrt(target_area * aspect_ratio)))
+                w = int(round(math.sqrt(target_area / aspect_ratio)))
+                if w < width and h < height:
+                    top = np.random.randint(0, height - h + 1)
+                    left = np.random.randint(0, width - w + 1)
+
+                    region = mask[top : top + h, left : left + w]
+                    num_masked = int(region.sum())
+                    # Overlap
+                    if 0 < h * w - num_masked <= max_mask_patches:
+                        delta = h * w - num_masked
+                        region[:, :] = 1
+
+                    if delta > 0:
+                        break
+            if delta == 0:
+                break
+            mask_count += delta
+        return mask
+
+else:
+    _generate_mask_numba = None
+
+
 class MaskingGenerator:
     def __init__(
         self,
@@ -241,6 +316,22 @@ class MaskingGenerator:
         max_aspect = max_aspect or 1 / min_aspect
         self.log_aspect_ratio = (math.log(min_aspect), math.log(max_aspect))
 
+        self._rng = None
+        self._rng_pid = None
+
+    def _get_rng(self):
+        # Seed lazily in the consuming process. The transform is built in
+        # the main process before the DataLoader forks its workers, and
+        # torch's per-worker seeding only reaches the legacy np.random
+        # global, so an eagerly created (or fork-inherited) Generator
+        # would yield the same mask sequence in every worker.
+        # torch.initial_seed() is distinct per worker and follows
+        # torch.manual_seed() in the main process.
+        if self._rng is None or self._rng_pid != os.getpid():
+            self._rng = np.random.default_rng(torch.initial_seed() % 2**32)
+            self._rng_pid = os.getpid()
+        return self._rng
+
     def __repr__(self):
         repr_str = "Generator(%d, %d -> [%d ~ %d], max = %d, %.3f ~ %.3f)" % (
             self.height,
@@ -258,30 +349,52 @@ class MaskingGenerator:
 
     def _mask(self, mask, max_mask_patches):
         delta = 0
-        for _attempt in range(10):
-            target_area = random.uniform(self.min_num_patches, max_mask_patches)
-            aspect_ratio = math.exp(random.uniform(*self.log_aspect_ratio))
+        rng = self._get_rng()
+        # Draw all per-attempt randomness in two batched calls instead of
+        # one Python-level RNG call per attempt.
+        # random.uniform accepted bounds in either order; numpy requires
+        # low <= high, so sort them (max_mask_patches can drop below
+        # min_num_patches near the end of masking).
+        low, high = sorted((self.min_num_patches, max_mask_patches))
+        target_areas = rng.uniform(low, high, size=10)
+        aspect_ratios = np.exp(rng.uniform(*self.log_aspect_ratio, size=10))
+        for target_area, aspect_ratio in zip(target_areas, aspect_ratios):
             h = int(round(math.sqrt(target_area * aspect_ratio)))
             w = int(round(math.sqrt(target_area / aspect_ratio)))
             if w < self.width and h < self.height:
-                top = random.randint(0, self.height - h)
-                left = random.randint(0, self.width - w)
+                top = int(rng.integers(0, self.height - h, endpoint=True))
+                left = int(rng.integers(0, self.width - w, endpoint=True))
 
-                num_masked = mask[top : top + h, left : left + w].sum()
+                region = mask[top : top + h, left : left + w]
+                num_masked = int(region.sum())
                 # Overlap
                 if 0 < h * w - num_masked <= max_mask_patches:
-                    for i in range(top, top + h):
-                        for j in range(left, left + w):
-                            if mask[i, j] == 0:
-                                mask[i, j] = 1
-                                delta += 1
+                    delta = h * w - num_masked
+                    region[...] = 1
 
                 if delta > 0:
                     break
         return delta
 
     def __call__(self):
-        mask = np.zeros(shape=self.get_shape(), dtype=np.int)
+        if _generate_mask_numba is not None:
+            # Drive the compiled path from the same per-process generator
+            # as the fallback so both stay seedable; note the mask itself
+            # comes from numba's RNG, so the two paths produce different
+            # (but individually reproducible) sequences.
+            seed = int(self._get_rng().integers(0, 2**31))
+            return _generate_mask_numba(
+                self.height,
+                self.width,
+                self.num_masking_patches,
+                self.min_num_patches,
+                self.max_num_patches,
+                self.log_aspect_ratio[0],
+                self.log_aspect_ratio[1],
+                seed,
+            )
+
+        mask = np.zeros(shape=self.get_shape(), dtype=np.uint8)
         mask_count = 0
         while mask_count < self.num_masking_patches:
             max_mask_patches = self.num_masking_patches - mask_count
@@ -329,9 +442,7 @@ class MaskedImageModelingTransform:
             )
         self.common_transform = transforms.Compose(
             [
-                transforms.Lambda(
-                    lambda img: img.convert("RGB") if img.mode != "RGB" else img
-                ),
+                convert_to_rgb,
                 resize_func,
             ]
         )
@@ -376,7 +487,10 @@ class MaskedImageModelingTransform:
                     if key not in output:
                         output[key] = []
                     output[key].append(transformed_output[key])
-            return output
+            # Stack each field into one batched tensor so downstream code
+            # indexes and collates tensors instead of Python lists of
+            # per-sample tensors
+            return {key: torch.stack(value) for key, value in output.items()}
         else:
             return self.transform(images)
 
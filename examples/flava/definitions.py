@@ -76,6 +76,9 @@ class TrainingArguments:
     adam_weight_decay: float = 0.01
     adam_betas: Tuple[float, float] = field(default_factory=lambda: (0.9, 0.999))
     warmup_steps: int = 2000
+    # Compile the FLAVA model with torch.compile so attention and FFN blocks
+    # are fused into generated kernels. Requires PyTorch 2.0+.
+    torch_compile: bool = False
 
 
 @dataclass
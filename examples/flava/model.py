@@ -15,6 +15,15 @@ from torchmultimodal.models.flava import (
 from transformers.optimization import get_cosine_schedule_with_warmup
 
 
+def compile_model(model: torch.nn.Module) -> torch.nn.Module:
+    if not hasattr(torch, "compile"):
+        raise RuntimeError(
+            "torch_compile requires PyTorch 2.0 or later, "
+            f"found {torch.__version__}"
+        )
+    return torch.compile(model)
+
+
 def get_optimizers_for_lightning(
     model: torch.nn.Module,
     learning_rate: float,
@@ -48,10 +57,13 @@ class FLAVAPreTrainingLightningModule(LightningModule):
         adam_betas: Tuple[int, int] = (0.9, 0.999),
         warmup_steps: int = 2000,
         max_steps: int = 450000,
+        torch_compile: bool = False,
         **flava_pretraining_kwargs: Any,
     ):
         super().__init__()
         self.model = flava_model_for_pretraining(**flava_pretraining_kwargs)
+        if torch_compile:
+            self.model = compile_model(self.model)
         self.learning_rate = learning_rate
         self.adam_eps = adam_eps
         self.adam_betas = adam_betas
@@ -127,12 +139,15 @@ class FLAVAClassificationLightningModule(LightningModule):
         adam_betas: Tuple[int, int] = (0.9, 0.999),
         warmup_steps: int = 2000,
         max_steps: int = 450000,
+        torch_compile: bool = False,
         **flava_classification_kwargs: Any,
     ):
         super().__init__()
         self.model = flava_model_for_classification(
             num_classes, **flava_classification_kwargs
         )
+        if torch_compile:
+            self.model = compile_model(self.model)
         self.learning_rate = learning_rate
         self.adam_eps = adam_eps
         self.adam_weight_decay = adam_weight_decay
@@ -50,6 +50,7 @@ def main():
         adam_betas=config.training.adam_betas,
         warmup_steps=config.training.warmup_steps,
         max_steps=config.training.lightning.max_steps,
+        torch_compile=config.training.torch_compile,
         **config.model,
     )
 
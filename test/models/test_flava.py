@@ -10,13 +10,17 @@ import torch
 from test.test_utils import assert_expected
 from torch import nn
 from torchmultimodal.models.flava import (
+    DalleVAEEncoder,
     flava_image_encoder,
+    flava_model,
     flava_model_for_classification,
-    flava_model_for_pretraining,
     flava_text_encoder,
+    FLAVAForPreTraining,
     FLAVAModel,
+    ImageEmbeddings,
 )
 from torchmultimodal.modules.layers.transformer import FLAVATransformerOutput
+from torchmultimodal.modules.losses.flava import FLAVAPretrainingLoss
 
 NUM_CLASSES = 2
 
@@ -35,19 +39,26 @@ class TestFLAVA(unittest.TestCase):
 
         # Test multimodal scenario
         output = flava(image, text, "mm", labels)
-        self.assertAlmostEqual(output.loss.item(), 0.9724, places=4)
+        self.assertAlmostEqual(output.loss.item(), 0.6780, places=4)
 
         # Test unimodal image scenario
         output = flava(image, text, "image", labels)
-        self.assertAlmostEqual(output.loss.item(), 0.5453, places=4)
+        self.assertAlmostEqual(output.loss.item(), 0.4913, places=4)
 
         # Test unimodal text scenario
         output = flava(image, text, "text", labels)
-        self.assertAlmostEqual(output.loss.item(), 0.7074, places=4)
+        self.assertAlmostEqual(output.loss.item(), 0.6817, places=4)
 
     @torch.no_grad()
     def test_forward_pretraining(self):
-        flava = flava_model_for_pretraining()
+        # Mirrors flava_model_for_pretraining but builds the codebook with
+        # random init so the test does not depend on downloading the
+        # pretrained weights
+        flava = FLAVAForPreTraining(
+            model=flava_model(),
+            image_codebook=DalleVAEEncoder(pretrained=False),
+            loss=FLAVAPretrainingLoss(),
+        )
         text = torch.randint(0, 30500, (2, 77), dtype=torch.long)
         image = torch.rand((2, 3, 224, 224))
         image_for_codebook = torch.rand(2, 3, 112, 112)
@@ -79,7 +90,7 @@ class TestFLAVA(unittest.TestCase):
             sum(
                 value if value is not None else 0 for value in output.losses.values()
             ).item(),
-            20.4199,
+            19.9569,
             places=4,
         )
 
@@ -103,7 +114,7 @@ class TestFLAVA(unittest.TestCase):
             sum(
                 value if value is not None else 0 for value in output.losses.values()
             ).item(),
-            9.3403,
+            8.7562,
             places=4,
         )
 
@@ -252,3 +263,53 @@ class TestFLAVAModel(unittest.TestCase):
         self._assert_empty(out.multimodal_masked)
         assert_expected(out.image, self.image_encoder(image))
         assert_expected(out.image_masked, self.image_encoder(image))
+
+
+class TestImageEmbeddingsPosEncodingCache(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(1234)
+        self.embeddings = ImageEmbeddings(image_size=4, patch_size=2, hidden_size=2)
+        # Patch tokens (plus CLS) for 6x6 and 8x8 inputs, both requiring
+        # interpolation of the 2x2 pretrained position encoding
+        self.tokens_six = torch.rand(1, 10, 2)
+        self.tokens_eight = torch.rand(1, 17, 2)
+
+    def test_cache_hit_at_inference(self):
+        with torch.no_grad():
+            first = self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+            second = self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+        self.assertIs(second, first)
+
+    def test_no_caching_with_grad_enabled(self):
+        first = self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+        self.assertEqual(len(self.embeddings._pos_encoding_cache), 0)
+        second = self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+        self.assertIsNot(second, first)
+        assert_expected(second, first)
+
+    def test_invalidation_on_inplace_update(self):
+        with torch.no_grad():
+            first = self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+            self.embeddings.position_embeddings.add_(1.0)
+            second = self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+        self.assertIsNot(second, first)
+        self.assertFalse(torch.equal(second, first))
+
+    def test_invalidation_on_module_move(self):
+        # .to() swaps the parameter without bumping its version; dtype moves
+        # exercise the same key fields as device moves without needing a GPU
+        with torch.no_grad():
+            first = self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+            self.embeddings.to(torch.float64)
+            second = self.embeddings.interpolate_pos_encoding(
+                self.tokens_six.to(torch.float64), 6, 6
+            )
+        self.assertIsNot(second, first)
+        self.assertEqual(second.dtype, torch.float64)
+
+    def test_single_entry_bound(self):
+        with torch.no_grad():
+            for _ in range(3):
+                self.embeddings.interpolate_pos_encoding(self.tokens_six, 6, 6)
+                self.embeddings.interpolate_pos_encoding(self.tokens_eight, 8, 8)
+        self.assertEqual(len(self.embeddings._pos_encoding_cache), 1)
@@ -67,6 +67,26 @@ class TestAttention(unittest.TestCase):
         )
         assert_expected(actual, expected, rtol=0, atol=1e-4)
 
+    def test_scaled_dot_product_attention_with_nd_mask(self):
+        # A mask shaped like the attention scores (extra leading token dims)
+        # must broadcast the same way it did before the fused dispatch
+        mask = torch.randint(0, 2, (1, self.n_heads, *self.input_shape, 2)).bool()
+        mask[..., 0] = True  # keep at least one attendable position per query
+        actual = scaled_dot_product_attention(self.q, self.k, self.v, mask=mask)
+
+        scores = torch.matmul(self.q, self.k.transpose(-1, -2)) / (
+            self.q.shape[-1] ** 0.5
+        )
+        scores = scores.masked_fill(~mask, float("-inf"))
+        expected = torch.matmul(torch.softmax(scores, dim=-1), self.v)
+        assert_expected(actual, expected, rtol=0, atol=1e-4)
+
+        # Non-bool masks gate attention on zero/nonzero entries
+        actual_long = scaled_dot_product_attention(
+            self.q, self.k, self.v, mask=mask.long()
+        )
+        assert_expected(actual_long, expected, rtol=0, atol=1e-4)
+
     def test_full_attention(self):
         actual = self.full(self.q, self.k, self.v)
         # Output of full attention should be same as scaled_dot_product_attention
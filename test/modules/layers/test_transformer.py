@@ -8,10 +8,13 @@ import unittest
 
 import torch
 from test.test_utils import assert_expected, set_rng_seed
+from torch import nn
 from torchmultimodal.models.flava import flava_image_encoder
 from torchmultimodal.modules.layers.transformer import (
     FLAVASelfAttention,
     FLAVATransformerEncoder,
+    FLAVATransformerWithoutEmbeddings,
+    get_extended_attention_mask,
 )
 
 
@@ -31,11 +34,78 @@ class TestTransformer(unittest.TestCase):
         with self.assertRaises(ValueError):
             _ = FLAVASelfAttention(hidden_size=3, num_attention_heads=2)
 
+    def test_flava_self_attention_legacy_state_dict(self):
+        # Checkpoints from before the fused qkv projection store separate
+        # query/key/value parameters; they should still load under strict mode
+        legacy = {
+            "query.weight": torch.rand(2, 2),
+            "query.bias": torch.rand(2),
+            "key.weight": torch.rand(2, 2),
+            "key.bias": torch.rand(2),
+            "value.weight": torch.rand(2, 2),
+            "value.bias": torch.rand(2),
+        }
+        attn = FLAVASelfAttention(hidden_size=2, num_attention_heads=1)
+        attn.load_state_dict(legacy, strict=True)
+
+        # The fused projection must match the three legacy projections
+        query, key, value = attn.qkv(self.test_input).chunk(3, dim=-1)
+        for actual, proj in ((query, "query"), (key, "key"), (value, "value")):
+            expected = torch.nn.functional.linear(
+                self.test_input, legacy[f"{proj}.weight"], legacy[f"{proj}.bias"]
+            )
+            assert_expected(actual, expected, rtol=0, atol=1e-6)
+
+        # New-format state dicts round-trip under strict mode
+        attn_reloaded = FLAVASelfAttention(hidden_size=2, num_attention_heads=1)
+        attn_reloaded.load_state_dict(attn.state_dict(), strict=True)
+        assert_expected(attn_reloaded.qkv.weight, attn.qkv.weight, rtol=0, atol=0)
+        assert_expected(attn_reloaded.qkv.bias, attn.qkv.bias, rtol=0, atol=0)
+
     def test_flava_transformer_without_embeddings_value_error(self):
         with self.assertRaises(ValueError):
             encoder = flava_image_encoder()
             _ = encoder()
 
+    def test_get_extended_attention_mask(self):
+        # Padding mask [batch_size, seq_length]
+        extended = get_extended_attention_mask(torch.tensor([[1.0, 1.0, 0.0]]))
+        assert_expected(
+            extended, torch.tensor([[[[0.0, 0.0, -10000.0]]]]), rtol=0, atol=0
+        )
+
+        # Self-attention mask [batch_size, from_seq_length, to_seq_length]
+        extended = get_extended_attention_mask(torch.tensor([[[1.0], [0.0]]]))
+        assert_expected(
+            extended, torch.tensor([[[[0.0], [-10000.0]]]]), rtol=0, atol=0
+        )
+
+        for invalid_dim_mask in (torch.ones(3), torch.ones(1, 1, 3, 3)):
+            with self.assertRaises(ValueError):
+                _ = get_extended_attention_mask(invalid_dim_mask)
+
+    def test_padding_mask_suppresses_attention(self):
+        transformer = FLAVATransformerWithoutEmbeddings(
+            encoder=self.encoder,
+            layernorm=nn.LayerNorm(2),
+            pooler=None,
+            use_cls_token=False,
+        )
+        padding_mask = torch.tensor([[1.0, 1.0, 0.0], [1.0, 0.0, 0.0]])
+
+        output = transformer(
+            hidden_states=self.test_input, attention_mask=padding_mask
+        )
+
+        # No query should place any attention weight on padded positions
+        attentions = torch.stack(output.attentions)
+        assert_expected(
+            attentions.masked_select(padding_mask.eq(0)[:, None, None, :]).sum(),
+            torch.tensor(0.0),
+            rtol=0,
+            atol=1e-4,
+        )
+
     def test_flava_encoder_forward(self):
         output = self.encoder(self.test_input)
 
@@ -45,8 +115,8 @@ class TestTransformer(unittest.TestCase):
 
         expected_last_hidden_state = torch.Tensor(
             [
-                [[0.4387, 2.2609], [0.4937, 2.1976], [0.1847, 2.4323]],
-                [[0.4651, 2.1418], [0.0404, 2.1412], [-0.1759, 1.9571]],
+                [[0.5188, 2.9211], [0.5459, 2.8468], [0.4209, 2.5473]],
+                [[0.6464, 2.6241], [0.2217, 2.6235], [0.0053, 2.4394]],
             ]
         )
         expected_hidden_states = torch.Tensor(
@@ -56,12 +126,12 @@ class TestTransformer(unittest.TestCase):
                     [[0.8161, 0.2282], [0.3914, 0.2276], [0.1751, 0.0436]],
                 ],
                 [
-                    [[0.7162, 1.0436], [0.7712, 0.9802], [0.4622, 1.2150]],
-                    [[0.7426, 0.9244], [0.3179, 0.9238], [0.1016, 0.7398]],
+                    [[0.6465, 1.0765], [0.6736, 1.0023], [0.5486, 0.7027]],
+                    [[0.7741, 0.7795], [0.3494, 0.7789], [0.1330, 0.5949]],
                 ],
                 [
-                    [[0.4387, 2.2609], [0.4937, 2.1976], [0.1847, 2.4323]],
-                    [[0.4651, 2.1418], [0.0404, 2.1412], [-0.1759, 1.9571]],
+                    [[0.5188, 2.9211], [0.5459, 2.8468], [0.4209, 2.5473]],
+                    [[0.6464, 2.6241], [0.2217, 2.6235], [0.0053, 2.4394]],
                 ],
             ]
         )
@@ -70,14 +140,14 @@ class TestTransformer(unittest.TestCase):
                 [
                     [
                         [
-                            [0.3503, 0.2993, 0.3503],
-                            [0.3503, 0.2994, 0.3503],
-                            [0.3503, 0.2993, 0.3503],
+                            [0.3393, 0.3214, 0.3393],
+                            [0.3393, 0.3214, 0.3393],
+                            [0.3393, 0.3214, 0.3393],
                         ],
                         [
-                            [0.2756, 0.4488, 0.2756],
-                            [0.2336, 0.5329, 0.2336],
-                            [0.2756, 0.4488, 0.2756],
+                            [0.3301, 0.3399, 0.3301],
+                            [0.3384, 0.3231, 0.3384],
+                            [0.3301, 0.3399, 0.3301],
                         ],
                     ],
                     [
@@ -24,6 +24,7 @@ from torchmultimodal.modules.layers.transformer import (
     FLAVATransformerEncoder,
     FLAVATransformerOutput,
     FLAVATransformerWithoutEmbeddings,
+    get_extended_attention_mask,
     init_transformer_weights,
 )
 from torchmultimodal.modules.losses.flava import (
@@ -395,25 +396,17 @@ class FLAVAModel(nn.Module, PretrainedMixin):
         multimodal_masked_outputs = FLAVATransformerOutput()
 
         if required_embedding == "mm":
-            # Take last hidden state and not the last_hidden_state because
+            # Take final hidden state and not the last_hidden_state because
             # for flava we want the hidden state without final layernorm.
             if not skip_unmasked_mm_encoder:
                 # Unmasked multimodal embedding is not currently used by any of the FLAVA losses.
                 multimodal_outputs = self.encode_mm(
-                    image_outputs.hidden_states[-1]
-                    if image_outputs.hidden_states
-                    else None,
-                    text_outputs.hidden_states[-1]
-                    if text_outputs.hidden_states
-                    else None,
+                    self._final_hidden_state(image_outputs),
+                    self._final_hidden_state(text_outputs),
                 )
             multimodal_masked_outputs = self.encode_mm(
-                image_masked_outputs.hidden_states[-1]
-                if image_masked_outputs.hidden_states
-                else None,
-                text_masked_outputs.hidden_states[-1]
-                if text_masked_outputs.hidden_states
-                else None,
+                self._final_hidden_state(image_masked_outputs),
+                self._final_hidden_state(text_masked_outputs),
             )
 
         return FLAVAOutput(
@@ -425,6 +418,12 @@ class FLAVAModel(nn.Module, PretrainedMixin):
             multimodal_masked=multimodal_masked_outputs,
         )
 
+    @staticmethod
+    def _final_hidden_state(
+        outputs: FLAVATransformerOutput,
+    ) -> Optional[Tensor]:
+        return outputs.hidden_states[-1] if outputs.hidden_states else None
+
     def encode_image(
         self, image: Tensor, image_patches_mask: Optional[Tensor] = None
     ) -> Optional[FLAVATransformerOutput]:
@@ -521,7 +520,8 @@ class FLAVAForPreTraining(nn.Module, PretrainedMixin):
         if image_for_codebook is not None:
             image_labels = self.image_codebook(image_for_codebook).flatten(1)
             image_patches_mask = image_patches_mask.flatten(1).to(torch.bool)
-            image_labels[~image_patches_mask] = -1
+            # ignore unmasked positions without materializing the inverted mask
+            image_labels = torch.where(image_patches_mask, image_labels, -1)
 
         flava_output: FLAVAOutput = self.model(
             image=image,
@@ -621,7 +621,10 @@ class PatchEmbeddings(nn.Module):
                 raise ValueError(
                     f"Input image size ({height}*{width}) doesn't match model ({self.image_size[0]}*{self.image_size[1]})."
                 )
-        x = self.projection(pixel_values).flatten(2).transpose(1, 2)
+        # Materialize the [batch, seq, dim] layout after the transpose so the
+        # embedding/encoder ops downstream read coalesced memory instead of
+        # the strided view over the conv output.
+        x = self.projection(pixel_values).flatten(2).transpose(1, 2).contiguous()
         return x
 
 
@@ -659,6 +662,10 @@ class ImageEmbeddings(nn.Module):
         else:
             self.mask_token = None
 
+        # Latest interpolated position encoding, keyed by input shape and
+        # parameter version; only consulted when autograd is off
+        self._pos_encoding_cache = {}
+
     def interpolate_pos_encoding(self, embeddings, height, width):
         """
         This method allows to interpolate the pre-trained position encodings, to be able to use the model on higher
@@ -671,11 +678,32 @@ class ImageEmbeddings(nn.Module):
         n = self.position_embeddings.shape[1] - 1
         if npatch == n and height == width:
             return self.position_embeddings
+
+        # The feature-map shape is invariant across a run, so at inference
+        # reuse the interpolated table instead of re-running the bicubic
+        # interpolation every forward. The parameter version in the key
+        # invalidates the cache whenever the weights are updated in place,
+        # and the device/dtype catch module.to()/.cuda(), which swap the
+        # parameter out without bumping its version.
+        cache_key = (
+            npatch,
+            height,
+            width,
+            self.position_embeddings.device,
+            self.position_embeddings.dtype,
+            self.position_embeddings._version,
+        )
+        if not torch.is_grad_enabled():
+            cached = self._pos_encoding_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         class_pos_embed = self.position_embeddings[:, 0]
         patch_pos_embed = self.position_embeddings[:, 1:]
         dim = embeddings.shape[-1]
-        h0 = height // self.config.patch_size
-        w0 = width // self.config.patch_size
+        patch_size = self.patch_embeddings.patch_size
+        h0 = height // patch_size[0]
+        w0 = width // patch_size[1]
         # we add a small number to avoid floating point error in the interpolation
         # see discussion at https://github.com/facebookresearch/dino/issues/8
         h0, w0 = h0 + 0.1, w0 + 0.1
@@ -692,7 +720,16 @@ class ImageEmbeddings(nn.Module):
             and int(w0) == patch_pos_embed.shape[-1]
         )
         patch_pos_embed = patch_pos_embed.permute(0, 2, 3, 1).view(1, -1, dim)
-        return torch.cat((class_pos_embed.unsqueeze(0), patch_pos_embed), dim=1)
+        pos_encoding = torch.cat(
+            (class_pos_embed.unsqueeze(0), patch_pos_embed), dim=1
+        )
+
+        if not torch.is_grad_enabled():
+            # Keep only the latest entry so alternating resolutions cannot
+            # grow the cache without bound
+            self._pos_encoding_cache = {cache_key: pos_encoding}
+
+        return pos_encoding
 
     def forward(
         self,
@@ -709,9 +746,10 @@ class ImageEmbeddings(nn.Module):
         if image_patches_mask is not None:
             if self.mask_token is not None:
                 mask_tokens = self.mask_token.expand(batch_size, seq_len, -1)
-                # replace the masked visual tokens by mask_tokens
-                w = image_patches_mask.unsqueeze(-1).type_as(mask_tokens)
-                embeddings = embeddings * (1 - w) + mask_tokens * w
+                # replace the masked visual tokens by mask_tokens with a single
+                # fused select instead of casting the mask to float and blending
+                w = image_patches_mask.unsqueeze(-1).to(torch.bool)
+                embeddings = torch.where(w, mask_tokens, embeddings)
             else:
                 warnings.warn(
                     "image_patches_mask passed but use_image_masking in init was false. Ignoring."
@@ -772,6 +810,9 @@ class ImageTransformer(nn.Module):
             pixel_values, image_patches_mask=image_patches_mask
         )
 
+        if attention_mask is not None and attention_mask.dim() < 4:
+            attention_mask = get_extended_attention_mask(attention_mask)
+
         encoder_outputs = self.encoder(
             embedding_output,
             attention_mask=attention_mask,
@@ -810,7 +851,8 @@ class ImageTransformerWithVAE(nn.Module):
     ):
         image_labels = self.vae(pixel_values).flatten(1)
         image_patches_mask = image_patches_mask.flatten(1).to(torch.bool)
-        image_labels[image_patches_mask == False] = -1  # noqa
+        # ignore unmasked positions without materializing the inverted mask
+        image_labels = torch.where(image_patches_mask, image_labels, -1)
 
         output = self.image_transformer(
             pixel_values=pixel_values,
@@ -952,29 +994,7 @@ class TextTransformer(nn.Module):
         Returns:
             `torch.Tensor` The extended attention mask, with a the same dtype as `attention_mask.dtype`.
         """
-        # We can provide a self-attention mask of dimensions [batch_size, from_seq_length, to_seq_length]
-        # ourselves in which case we just need to make it broadcastable to all heads.
-        if attention_mask.dim() == 3:
-            extended_attention_mask = attention_mask[:, None, :, :]
-        elif attention_mask.dim() == 2:
-            # Provided a padding mask of dimensions [batch_size, seq_length]
-            # - if the model is an encoder, make the mask broadcastable to [batch_size, num_heads, seq_length, seq_length]
-            extended_attention_mask = attention_mask[:, None, None, :]
-        else:
-            raise ValueError(
-                f"Wrong shape for input_ids (shape {input_shape}) or attention_mask (shape {attention_mask.shape})"
-            )
-
-        # Since attention_mask is 1.0 for positions we want to attend and 0.0 for
-        # masked positions, this operation will create a tensor which is 0.0 for
-        # positions we want to attend and -10000.0 for masked positions.
-        # Since we are adding it to the raw scores before the softmax, this is
-        # effectively the same as removing these entirely.
-        extended_attention_mask = extended_attention_mask.to(
-            dtype=attention_mask.dtype
-        )  # fp16 compatibility
-        extended_attention_mask = (1.0 - extended_attention_mask) * -10000.0
-        return extended_attention_mask
+        return get_extended_attention_mask(attention_mask)
 
     def forward(
         self,
@@ -45,11 +45,13 @@ class LSTMEncoder(nn.Module):
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         _, x = self.lstm(self.embedding(x))
-        # N x B x H => B x X x H where N = num_layers * num_directions
-        x = x[0].transpose(0, 1)
+        # Final hidden state is N x B x H where N = num_layers * num_directions
+        x = x[0]
 
         # N should be 2 so we can merge in that dimension
-        assert x.size(1) == 2, "hidden state (final) should have 1st dim as 2"
+        assert x.size(0) == 2, "hidden state (final) should have 0th dim as 2"
 
-        x = torch.cat([x[:, 0, :], x[:, 1, :]], dim=-1)
+        # Concatenate the two directions directly instead of transposing to
+        # batch-first and gathering strided slices
+        x = torch.cat([x[0], x[1]], dim=-1)
         return x
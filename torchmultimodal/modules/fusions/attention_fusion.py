@@ -53,10 +53,9 @@ class AttentionFusionModule(nn.Module):
             projected_embedding = projection(embeddings[channel])
             projected_embeddings.append(projected_embedding)
 
-        for i in range(len(projected_embeddings)):
-            projected_embeddings[i] = (
-                attention_weights[:, i].unsqueeze(-1) * projected_embeddings[i]
-            )
-
-        fused = torch.sum(torch.stack(projected_embeddings), dim=0)
+        # Apply the attention weights and reduce over all channels in one
+        # batched op instead of scaling each projection in a Python loop
+        stacked_embeddings = torch.stack(projected_embeddings)
+        weights = attention_weights.transpose(0, 1).unsqueeze(-1)
+        fused = torch.sum(weights * stacked_embeddings, dim=0)
         return fused
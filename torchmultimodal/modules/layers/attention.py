@@ -226,18 +226,37 @@ def scaled_dot_product_attention(
     to handle n-dimensional input tokens (images, video) and support multihead.
     Computes attention as described in Attention Is All You Need (Vaswani et al. 2017)
 
+    Dispatches to ``F.scaled_dot_product_attention`` so fused kernels
+    (FlashAttention, memory-efficient attention) are used when available and
+    the full score matrix is never materialized.
+
     Inputs:
         q, k, v (Tensor): a [b, h, d1, ..., dn, c] tensor
     """
 
-    attn = torch.matmul(q, k.transpose(-1, -2))
-    attn = attn / torch.sqrt(torch.tensor(q.shape[-1]))
-    if mask is not None:
-        attn = attn.masked_fill(mask == 0, float("-inf"))
-    attn_float = F.softmax(attn, dim=-1)
-    attn = attn_float.type_as(attn)  # b x n_head x (d1, ..., dn) x c
-    attn = F.dropout(attn, p=attn_dropout)
+    if mask is not None and mask.dtype != torch.bool:
+        # The mask acts as a gate: zero entries may not be attended to. Fused
+        # SDPA expects a bool mask where True means "participate".
+        mask = mask.ne(0)
+
+    # Attention is computed over the last token dim; fused SDPA expects at
+    # most one batch and one head dim, so fold any extra leading token dims
+    # (e.g. video) into the batch and restore them afterwards.
+    batch_shape = q.shape[:-2]
+    if len(batch_shape) > 2:
+        q = q.flatten(end_dim=-3)
+        k = k.flatten(end_dim=-3)
+        v = v.flatten(end_dim=-3)
+        if mask is not None and mask.dim() > 2:
+            # Fold the mask's leading dims the same way; expand first since
+            # the mask may rely on broadcasting against the score shape.
+            mask = mask.expand(batch_shape + mask.shape[-2:]).flatten(end_dim=-3)
+
+    a = F.scaled_dot_product_attention(
+        q, k, v, attn_mask=mask, dropout_p=attn_dropout
+    )  # b x n_head x (d1, ..., dn) x c
 
-    a = torch.matmul(attn, v)  # b x n_head x (d1, ..., dn) x c
+    if len(batch_shape) > 2:
+        a = a.unflatten(0, batch_shape)
 
     return a
@@ -79,8 +79,12 @@ class Codebook(nn.Module):
             num_repeats = (n + num_vectors - 1) // num_vectors
             # Add a small amount of noise to repeated vectors
             std = 0.01 / torch.sqrt(torch.tensor(num_channels))
-            x = x.repeat(num_repeats, 1)
-            x = x + torch.randn_like(x) * std
+            # Broadcast over a new tile dim instead of materializing the
+            # repeated tensor; the noise add is the only real allocation
+            x = x + torch.randn(
+                num_repeats, num_vectors, num_channels, device=x.device, dtype=x.dtype
+            ) * std
+            x = x.flatten(end_dim=1)
         return x
 
     def _get_random_vectors(self, x: Tensor, n: int) -> Tensor:
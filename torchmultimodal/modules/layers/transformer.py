@@ -16,6 +16,14 @@ import torch
 from torch import nn, Tensor
 from torchmultimodal.modules.layers.normalizations import Fp32LayerNorm
 
+
+def _dropout_or_identity(p: float) -> nn.Module:
+    # FLAVA defaults all dropout probabilities to 0.0; a Dropout module with
+    # p=0 still launches a kernel per call in training mode, so swap in a
+    # no-op instead.
+    return nn.Dropout(p) if p > 0.0 else nn.Identity()
+
+
 FLAVATransformerOutput = namedtuple(
     "FLAVATransformerOutput",
     ["last_hidden_state", "pooler_output", "hidden_states", "attentions"],
@@ -41,11 +49,42 @@ class FLAVASelfAttention(nn.Module):
         self.attention_head_size = int(hidden_size / num_attention_heads)
         self.all_head_size = self.num_attention_heads * self.attention_head_size
 
-        self.query = nn.Linear(hidden_size, self.all_head_size)
-        self.key = nn.Linear(hidden_size, self.all_head_size)
-        self.value = nn.Linear(hidden_size, self.all_head_size)
+        # Single fused projection for query/key/value: one GEMM instead of
+        # three improves BLAS utilization and reduces kernel launches.
+        self.qkv = nn.Linear(hidden_size, 3 * self.all_head_size)
+
+        self.dropout = _dropout_or_identity(attention_probs_dropout_prob)
 
-        self.dropout = nn.Dropout(attention_probs_dropout_prob)
+    def _load_from_state_dict(
+        self,
+        state_dict,
+        prefix,
+        local_metadata,
+        strict,
+        missing_keys,
+        unexpected_keys,
+        error_msgs,
+    ):
+        # Checkpoints predating the fused projection store separate
+        # query/key/value parameters; stitch them into qkv on load so
+        # published state dicts keep working.
+        for param_name in ("weight", "bias"):
+            legacy_keys = [
+                f"{prefix}{proj}.{param_name}" for proj in ("query", "key", "value")
+            ]
+            if all(key in state_dict for key in legacy_keys):
+                state_dict[f"{prefix}qkv.{param_name}"] = torch.cat(
+                    [state_dict.pop(key) for key in legacy_keys]
+                )
+        super()._load_from_state_dict(
+            state_dict,
+            prefix,
+            local_metadata,
+            strict,
+            missing_keys,
+            unexpected_keys,
+            error_msgs,
+        )
 
     def transpose_for_scores(self, x: Tensor) -> Tensor:
         new_x_shape = x.size()[:-1] + (
@@ -61,9 +100,11 @@ class FLAVASelfAttention(nn.Module):
         attention_mask: Tensor = None,
         head_mask: Tensor = None,
     ):
-        mixed_query_layer = self.query(hidden_states)
-        key_layer = self.transpose_for_scores(self.key(hidden_states))
-        value_layer = self.transpose_for_scores(self.value(hidden_states))
+        mixed_query_layer, mixed_key_layer, mixed_value_layer = self.qkv(
+            hidden_states
+        ).chunk(3, dim=-1)
+        key_layer = self.transpose_for_scores(mixed_key_layer)
+        value_layer = self.transpose_for_scores(mixed_value_layer)
 
         query_layer = self.transpose_for_scores(mixed_query_layer)
 
@@ -110,7 +151,7 @@ class FLAVAAttention(nn.Module):
             attention_probs_dropout_prob=attention_probs_dropout_prob,
         )
         self.output = nn.Linear(hidden_size, hidden_size)
-        self.dropout = nn.Dropout(hidden_dropout_prob)
+        self.dropout = _dropout_or_identity(hidden_dropout_prob)
 
     def forward(
         self,
@@ -153,7 +194,7 @@ class FLAVATransformerLayer(nn.Module):
         self.intermediate = nn.Linear(hidden_size, intermediate_size)
         self.intermediate_activation = intermediate_activation
         self.output = nn.Linear(intermediate_size, hidden_size)
-        self.dropout = nn.Dropout(hidden_dropout_prob)
+        self.dropout = _dropout_or_identity(hidden_dropout_prob)
         self.layernorm_before = Fp32LayerNorm(hidden_size, eps=layer_norm_eps)
         self.layernorm_after = Fp32LayerNorm(hidden_size, eps=layer_norm_eps)
 
@@ -177,8 +218,14 @@ class FLAVATransformerLayer(nn.Module):
             1:
         ]  # add self attentions if we output attention weights
 
-        # first residual connection
-        hidden_states = attention_output + hidden_states
+        # first residual connection; accumulate into the attention output
+        # in inference mode to avoid allocating a fresh activation tensor
+        # (hidden_states itself is recorded by the encoder and must not be
+        # written in place)
+        if torch.is_grad_enabled():
+            hidden_states = attention_output + hidden_states
+        else:
+            hidden_states = attention_output.add_(hidden_states)
 
         # in ViT, layernorm is also applied after self-attention
         layer_output = self.layernorm_after(hidden_states)
@@ -296,6 +343,9 @@ class FLAVATransformerWithoutEmbeddings(nn.Module):
         if hidden_states is None:
             raise ValueError("You have to specify hidden_states")
 
+        if attention_mask is not None and attention_mask.dim() < 4:
+            attention_mask = get_extended_attention_mask(attention_mask)
+
         if self.cls_token is not None:
             batch_size = hidden_states.shape[0]
             cls_tokens = self.cls_token.expand(batch_size, -1, -1)
@@ -316,6 +366,32 @@ class FLAVATransformerWithoutEmbeddings(nn.Module):
         )
 
 
+def get_extended_attention_mask(attention_mask: Tensor) -> Tensor:
+    """Makes attention masks broadcastable along head and sequence dimensions.
+
+    Accepts a mask with ones indicating tokens to attend to and zeros for
+    tokens to ignore, either a padding mask of shape ``[batch_size, seq_length]``
+    or a self-attention mask of shape ``[batch_size, from_seq_length,
+    to_seq_length]``, and converts it into the additive float bias (0.0 to
+    attend, -10000.0 to ignore) the attention layers add to the raw scores.
+    The conversion is done once per forward so every layer reuses the same
+    bias tensor.
+    """
+    if attention_mask.dim() == 3:
+        extended_attention_mask = attention_mask[:, None, :, :]
+    elif attention_mask.dim() == 2:
+        # Provided a padding mask of dimensions [batch_size, seq_length]
+        # - the model is an encoder, so make the mask broadcastable to
+        # [batch_size, num_heads, seq_length, seq_length]
+        extended_attention_mask = attention_mask[:, None, None, :]
+    else:
+        raise ValueError(
+            f"Wrong shape for attention_mask (shape {attention_mask.shape})"
+        )
+    extended_attention_mask = (1.0 - extended_attention_mask) * -10000.0
+    return extended_attention_mask
+
+
 def init_transformer_weights(module, initializer_range):
     """Initialize the weights"""
     if isinstance(module, (nn.Linear, nn.Conv2d)):
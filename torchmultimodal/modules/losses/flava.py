@@ -431,13 +431,25 @@ class FLAVAPretrainingLoss(nn.Module):
             if mim_labels is not None:
                 mim_labels = mim_labels[pos_mask]
 
+        # The fused sequence is laid out as [multimodal CLS, image CLS,
+        # image patches, text tokens]; record each modality's boundary once
+        # here instead of re-deriving it inline at the loss sites below.
+        if multimodal_masked_sequence is not None:
+            if self.mmm_text_loss_weight > 0:
+                text_start_index = (
+                    -mlm_labels.size(1)
+                    if mlm_labels is not None
+                    else -(text_masked_sequence.size(1) - 1)
+                )
+            if self.mmm_image_loss_weight > 0:
+                num_image_tokens = (
+                    mim_labels.size(1)
+                    if mlm_labels is not None
+                    else (image_masked_sequence.size(1) - 1)
+                )
+
         if multimodal_masked_sequence is not None and self.mmm_text_loss_weight > 0:
-            start_index = (
-                -mlm_labels.size(1)
-                if mlm_labels is not None
-                else -(text_masked_sequence.size(1) - 1)
-            )
-            sequence_for_text = multimodal_masked_sequence[:, start_index:, :]
+            sequence_for_text = multimodal_masked_sequence[:, text_start_index:, :]
             outputs.mmm_text_output = self.mmm_loss.mlm(
                 sequence_for_text,
                 mlm_labels,
@@ -448,12 +460,9 @@ class FLAVAPretrainingLoss(nn.Module):
         if multimodal_masked_sequence is not None and self.mmm_image_loss_weight > 0:
             # Starts from 2 because of 2 CLS, one for multimodal encoder and one
             # that comes from image encoder.
-            total_indices = (
-                mim_labels.size(1)
-                if mlm_labels is not None
-                else (image_masked_sequence.size(1) - 1)
-            )
-            sequence_for_image = multimodal_masked_sequence[:, 2 : 2 + total_indices, :]
+            sequence_for_image = multimodal_masked_sequence[
+                :, 2 : 2 + num_image_tokens, :
+            ]
             outputs.mmm_image_output = self.mmm_loss.mim(
                 sequence_for_image,
                 mim_labels,